@@ -0,0 +1,19 @@
+# --------------------------------------------------------------------------
+# Cython declarations for clio.py. When the module is compiled, these static
+# types turn Option into an extension type whose attributes are stored as C
+# struct fields. The declarations have no effect on the pure-Python module.
+# --------------------------------------------------------------------------
+
+
+cdef class Option:
+    cdef public int type
+    cdef public object convert
+    cdef public tuple aliases
+    cdef public bint found
+    cdef public bint greedy
+    cdef public list values
+
+
+# Compiled as a plain C function so the per-argument check avoids the
+# overhead of a Python call.
+cdef bint _is_arg(object arg)
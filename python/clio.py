@@ -6,6 +6,10 @@
 # License: Public Domain
 # --------------------------------------------------------------------------
 
+# When compiled with Cython, skip the bounds and negative-index checks on
+# sequence indexing. (Every index used with a constant is known to be valid.)
+# cython: boundscheck=False, wraparound=False
+
 import sys
 
 
@@ -13,77 +17,83 @@ import sys
 __version__ = "2.1.0"
 
 
-# Print a message to stderr and exit with a non-zero error code.
+# Exception raised for invalid user input. As a subclass of SystemExit, if
+# uncaught it prints its message to stderr and exits with a non-zero error
+# code; applications that need to handle input errors themselves can catch it.
+class ClioError(SystemExit):
+    pass
+
+
+# Raise a ClioError for invalid user input. (This exits the application with
+# an error message unless the ClioError is caught.)
 def err(msg):
-    sys.exit("Error: %s." % msg)
+    raise ClioError("Error: %s." % msg)
 
 
 # Exception raised when an invalid API call is attempted. (Invalid user input
-# does not raise an exception; instead the application exits with an error
-# message.)
+# raises a ClioError instead, which exits the application with an error
+# message unless caught.)
 class ArgParserError(Exception):
     pass
 
 
+# Option types. An option's type is stored as a small integer so type checks
+# are simple integer comparisons. The type also indexes the lookup tables below.
+TYPE_BOOL = 0
+TYPE_INT = 1
+TYPE_FLOAT = 2
+TYPE_STR = 3
+
+# Functions for converting string arguments to option values, indexed by type.
+# (Converting a string argument to a string is a null operation.)
+_CONVERTERS = (None, int, float, str)
+
+# Type descriptions for use in error messages, indexed by type.
+_TYPE_NAMES = ("a boolean", "an integer", "a float", "a string")
+
+
 # Internal class for storing option data.
-#  * Option type is one of 'bool', 'string', 'int', or 'float'.
+#  * Option type is one of TYPE_BOOL, TYPE_STR, TYPE_INT, or TYPE_FLOAT.
+#  * The type's converter function is bound to the option when it's created.
 #  * A 'greedy' list option attempts to parse multiple consecutive arguments.
+#  * Aliases are stored as a tuple of interned strings.
+#  * The option's value is the last value in its list, or None if the list is
+#    empty. The list is the only copy, so values appended directly to the list
+#    returned by get_*_list() are visible to get_*() too.
 class Option:
 
+    # Options are accessed repeatedly while parsing so we use slots to give
+    # instances a fixed layout with no per-instance dictionary.
+    __slots__ = (
+        'type', 'convert', 'aliases', 'found', 'greedy', 'values',
+    )
+
     def __init__(self, type):
         self.type = type
+        self.convert = _CONVERTERS[type]
+        self.aliases = ()
         self.found = False
         self.greedy = False
         self.values = []
 
-    # Appends a value to the option's internal list.
-    def append(self, value):
-        self.values.append(value)
-
-    # Clears the option's internal list of values.
-    def clear(self):
-        self.values.clear()
-
-    # Returns the last value from the option's internal list.
+    # Returns the last value from the option's internal list, or None if the
+    # list is empty. (We index with len() rather than -1 as the compiled module
+    # is built with wraparound checks disabled.)
     @property
     def value(self):
-        return self.values[-1]
-
-
-# Internal class for making a list of arguments available as a stream.
-class ArgStream:
-
-    def __init__(self, args):
-        self.args = list(args)
-        self.length = len(self.args)
-        self.index = 0
-
-    # Returns the next argument from the stream.
-    def next(self):
-        self.index += 1
-        return self.args[self.index - 1]
-
-    # Returns the next argument from the stream without consuming it.
-    def peek(self):
-        return self.args[self.index]
-
-    # Returns true if the stream contains at least one more element.
-    def has_next(self):
-        return self.index < self.length
-
-    # Returns true if the stream contains at least one more element and that
-    # element has the form of an option value.
-    def has_next_value(self):
-        if self.has_next():
-            arg = self.peek()
-            if arg.startswith('-'):
-                if arg == '-' or arg[1].isdigit():
-                    return True
-                else:
-                    return False
-            else:
-                return True
-        return False
+        values = self.values
+        if values:
+            return values[len(values) - 1]
+        return None
+
+
+# Returns true if the argument has the form of an option value, i.e. if it
+# doesn't begin with a dash or consists of a single dash or a dash followed by
+# a digit.
+def _is_arg(arg):
+    if arg[:1] == "-":
+        return len(arg) == 1 or arg[1].isdigit()
+    return True
 
 
 # ArgParser is the workhorse class of the toolkit. An ArgParser instance is
@@ -106,13 +116,21 @@ class ArgParser:
         # Stores Option instances indexed by name.
         self.options = {}
 
-        # Stores command sub-parser instances indexed by command name.
-        self.commands = {}
+        # Lookup table mapping the character codes of single-character ASCII
+        # aliases to Option instances, used for parsing short-form options.
+        # Built by _finalize() before parsing and reset whenever a new option
+        # is registered.
+        self._short_table = None
 
-        # Stores command callbacks indexed by command name.
-        self.callbacks = {}
+        # List of unique Option instances sorted by name, used for debugging
+        # output. Built by _finalize() and reset whenever a new option is
+        # registered.
+        self._sorted_opts = None
 
-        # Stores positional arguments parsed from the input stream.
+        # Stores (sub-parser, callback) tuples indexed by command name.
+        self.commands = {}
+
+        # Stores positional arguments parsed from the argument list.
         self.arguments = []
 
         # Stores the command name, if a command was found while parsing.
@@ -126,11 +144,10 @@ class ArgParser:
 
     # Enable dictionary/list-style access to options and arguments.
     def __getitem__(self, key):
-        if isinstance(key, int) or isinstance(key, slice):
-            return self.arguments[key]
+        if isinstance(key, str):
+            return self._get_opt(key).value
         else:
-            option = self._get_opt(key)
-            return option.value
+            return self.arguments[key]
 
     # List all options and arguments for debugging.
     def __str__(self):
@@ -138,8 +155,11 @@ class ArgParser:
 
         lines.append("Options:")
         if len(self.options):
-            for name, option in sorted(self.options.items()):
-                lines.append("  %s: %s" % (name, option.values))
+            if self._sorted_opts is None:
+                self._finalize()
+            for option in self._sorted_opts:
+                aliases = " ".join(option.aliases)
+                lines.append("  %s: %s" % (aliases, option.values))
         else:
             lines.append("  [none]")
 
@@ -167,51 +187,78 @@ class ArgParser:
     # Registering options.
     # ----------------------------------------------------------------------
 
+    # Register an Option instance under each of the space-separated aliases in
+    # the name string. Aliases are interned so dictionary lookups using
+    # identical strings - including string literals, which Python interns
+    # automatically - can match on identity without a full comparison.
+    def _register_opt(self, option, name):
+        self._sorted_opts = None
+        self._short_table = None
+        option.aliases = tuple(sys.intern(alias) for alias in name.split())
+        for alias in option.aliases:
+            self.options[alias] = option
+
+    # Build the lookup structures derived from the options dictionary. The set
+    # of registered options is fixed by the time we start parsing so these only
+    # need to be rebuilt after a new registration.
+    #  * A condensed option like -abc is resolved by indexing a table of
+    #    character codes instead of hashing each character.
+    #  * The sorted list of options, deduplicated across aliases, is built
+    #    once rather than on every call to __str__.
+    def _finalize(self):
+        table = [None] * 128
+        unique = {}
+        for alias, option in self.options.items():
+            if len(alias) == 1 and ord(alias) < 128:
+                table[ord(alias)] = option
+            unique[id(option)] = option
+        self._short_table = table
+        self._sorted_opts = sorted(
+            unique.values(), key=lambda option: option.aliases[0])
+
     # Register an option with a default value.
     def _add_opt(self, type, name, default):
         option = Option(type)
-        option.append(default)
-        for alias in name.split():
-            self.options[alias] = option
+        option.values.append(default)
+        self._register_opt(option, name)
 
     # Register a boolean option with a default value of false.
     def add_flag(self, name):
-        self._add_opt("bool", name, False)
+        self._add_opt(TYPE_BOOL, name, False)
 
     # Register a string option with a default value.
     def add_str(self, name, default):
-        self._add_opt("string", name, default)
+        self._add_opt(TYPE_STR, name, default)
 
     # Register an integer option with a default value.
     def add_int(self, name, default):
-        self._add_opt("int", name, default)
+        self._add_opt(TYPE_INT, name, default)
 
     # Register a float option with a default value.
     def add_float(self, name, default):
-        self._add_opt("float", name, default)
+        self._add_opt(TYPE_FLOAT, name, default)
 
     # Register a list option.
     def _add_list_opt(self, type, name, greedy):
         option = Option(type)
         option.greedy = greedy
-        for alias in name.split():
-            self.options[alias] = option
+        self._register_opt(option, name)
 
     # Register a boolean list option.
     def add_flag_list(self, name):
-        self._add_list_opt("bool", name, False)
+        self._add_list_opt(TYPE_BOOL, name, False)
 
     # Register a string list option.
     def add_str_list(self, name, greedy=False):
-        self._add_list_opt("string", name, greedy)
+        self._add_list_opt(TYPE_STR, name, greedy)
 
     # Register an integer list option.
     def add_int_list(self, name, greedy=False):
-        self._add_list_opt("int", name, greedy)
+        self._add_list_opt(TYPE_INT, name, greedy)
 
     # Register a float list option.
     def add_float_list(self, name, greedy=False):
-        self._add_list_opt("float", name, greedy)
+        self._add_list_opt(TYPE_FLOAT, name, greedy)
 
     # ----------------------------------------------------------------------
     # Retrieving options.
@@ -225,10 +272,9 @@ class ArgParser:
     # Returns the specified Option instance or raises an exception.
     def _get_opt(self, name):
         option = self.options.get(name)
-        if option:
-            return option
-        else:
+        if option is None:
             raise ArgParserError("'%s' is not a registered option" % name)
+        return option
 
     # Returns the value of the specified option.
     def get_flag(self, name):
@@ -246,6 +292,12 @@ class ArgParser:
     def get_float(self, name):
         return self._get_opt(name).value
 
+    # Returns a dictionary mapping each of the specified option names to the
+    # option's value.
+    def get_opts(self, names):
+        get_opt = self._get_opt
+        return {name: get_opt(name).value for name in names}
+
     # Returns the length of the specified option's list of values.
     def len_list(self, name):
         return len(self._get_opt(name).values)
@@ -273,32 +325,23 @@ class ArgParser:
     # Clear the specified option's internal list of values.
     def clear_list(self, name):
         option = self._get_opt(name)
-        option.clear()
-
-    # Append a value to the specified option's internal list.
-    def _set_opt(self, name, value):
-        option = self._get_opt(name)
-        option.append(value)
+        option.values.clear()
 
     # Append a value to the specified option's internal list.
     def set_flag(self, name, value):
-        option = self._get_opt(name)
-        option.append(value)
+        self._get_opt(name).values.append(value)
 
     # Append a value to the specified option's internal list.
     def set_str(self, name, value):
-        option = self._get_opt(name)
-        option.append(value)
+        self._get_opt(name).values.append(value)
 
     # Append a value to the specified option's internal list.
     def set_int(self, name, value):
-        option = self._get_opt(name)
-        option.append(value)
+        self._get_opt(name).values.append(value)
 
     # Append a value to the specified option's internal list.
     def set_float(self, name, value):
-        option = self._get_opt(name)
-        option.append(value)
+        self._get_opt(name).values.append(value)
 
     # ----------------------------------------------------------------------
     # Commands.
@@ -308,9 +351,9 @@ class ArgParser:
     def add_cmd(self, name, helptext, callback):
         parser = ArgParser(helptext)
         parser.parent = self
-        for alias in name.split():
-            self.commands[alias] = parser
-            self.callbacks[alias] = callback
+        entry = (parser, callback)
+        for alias in map(sys.intern, name.split()):
+            self.commands[alias] = entry
         return parser
 
     # Returns true if the parser has found a registered command.
@@ -352,31 +395,34 @@ class ArgParser:
     # Convenience function: attempts to parse and return the positional
     # arguments as a list of integers.
     def get_args_as_ints(self):
-        args = []
-        for arg in self.arguments:
-            try:
-                args.append(int(arg))
-            except ValueError:
-                err("cannot parse '%s' as an integer" % arg)
-        return args
+        return self._get_args_as(TYPE_INT)
 
     # Convenience function: attempts to parse and return the positional
     # arguments as a list of floats.
     def get_args_as_floats(self):
-        args = []
-        for arg in self.arguments:
-            try:
-                args.append(float(arg))
-            except ValueError:
-                err("cannot parse '%s' as a float" % arg)
-        return args
+        return self._get_args_as(TYPE_FLOAT)
+
+    # Converts the positional arguments to the specified type. The whole list
+    # is converted in a single map() call; we only search for the argument
+    # which failed to parse if we need to report an error.
+    def _get_args_as(self, argtype):
+        convert = _CONVERTERS[argtype]
+        try:
+            return list(map(convert, self.arguments))
+        except ValueError:
+            for arg in self.arguments:
+                try:
+                    convert(arg)
+                except ValueError:
+                    err("cannot parse '%s' as %s" % (
+                        arg, _TYPE_NAMES[argtype]))
 
     # Clear the list of positional arguments.
     def clear_args(self):
         self.arguments.clear()
 
     # Append a string to the list of positional arguments.
-    def append_arg(arg):
+    def append_arg(self, arg):
         self.arguments.append(arg)
 
     # ----------------------------------------------------------------------
@@ -384,12 +430,43 @@ class ArgParser:
     # ----------------------------------------------------------------------
 
     # Parse a list of string arguments. We default to parsing the command
-    # line arguments, skipping the application path.
-    def parse(self, args=sys.argv[1:]):
-        self.parse_stream(ArgStream(args))
-
-    # Parse a stream of string arguments.
-    def parse_stream(self, stream):
+    # line arguments, skipping the application path. Lists and tuples are
+    # parsed in place; any other iterable is copied into a list first.
+    def parse(self, args=None):
+        if args is None:
+            args = sys.argv[1:]
+        elif not isinstance(args, (list, tuple)):
+            args = list(args)
+
+        # Commands are handled iteratively rather than recursively. When a
+        # parser finds a command it returns the command's parser and callback
+        # along with the index at which to resume, and we continue parsing the
+        # same list with the command's parser. Callbacks are run once parsing
+        # is complete, innermost command first.
+        parser = self
+        i = 0
+        callbacks = []
+        while parser is not None:
+            parser, callback, i = parser._parse(args, i)
+            if callback is not None:
+                callbacks.append((callback, parser))
+        for callback, cmd_parser in reversed(callbacks):
+            callback(cmd_parser)
+
+    # Parse the list of string arguments starting from index i. The list is
+    # never modified or copied. If we find a command, we stop and return a
+    # (parser, callback, index) tuple for the command so the caller can resume
+    # parsing with the command's parser; otherwise we return (None, None, n).
+    def _parse(self, args, i):
+        n = len(args)
+
+        # Build the short-form option table if required.
+        if self._short_table is None:
+            self._finalize()
+
+        # Bind frequently used names to locals for the loop below.
+        append_arg = self.arguments.append
+        get_cmd = self.commands.get
 
         # Switch to turn off option parsing if we encounter a double dash,
         # '--'. Everything following the '--' will be treated as a positional
@@ -397,49 +474,57 @@ class ArgParser:
         parsing = True
 
         # Loop while we have arguments to process.
-        while stream.has_next():
+        while i < n:
 
-            # Fetch the next argument from the stream.
-            arg = stream.next()
+            # Fetch the next argument from the list.
+            arg = args[i]
+            i += 1
 
             # If option parsing has been turned off, simply add the argument to
             # the list of positionals.
             if not parsing:
-                self.arguments.append(arg)
+                append_arg(arg)
                 continue
 
-            # If we encounter a '--' argument, turn off option-parsing.
-            if arg == "--":
-                parsing = False
+            # Arguments beginning with a dash are either options, the '--'
+            # switch, or positional arguments of the form '-' or '-123'. We
+            # branch on the first character to avoid repeated prefix tests.
+            if arg[:1] == "-":
 
-            # Is the argument a long-form option?
-            elif arg.startswith("--"):
-                self._parse_long_opt(arg[2:], stream)
+                # Is the argument a long-form option? If the argument is a
+                # bare '--', turn off option-parsing.
+                if arg[:2] == "--":
+                    if len(arg) == 2:
+                        parsing = False
+                    else:
+                        i = self._parse_long_opt(arg[2:], args, i)
 
-            # Is the argument a short-form option? If the argument consists of
-            # a single dash or a dash followed by a digit, we treat it as a
-            # positional argument.
-            elif arg.startswith("-"):
-                if arg == '-' or arg[1].isdigit():
-                    self.arguments.append(arg)
+                # Is the argument a short-form option? If the argument
+                # consists of a single dash or a dash followed by a digit, we
+                # treat it as a positional argument.
+                elif len(arg) == 1 or arg[1].isdigit():
+                    append_arg(arg)
                 else:
-                    self._parse_short_opt(arg[1:], stream)
+                    i = self._parse_short_opt(arg[1:], args, i)
+                continue
 
-            # Is the argument a registered command?
-            elif arg in self.commands:
-                cmd_parser = self.commands[arg]
-                cmd_callback = self.callbacks[arg]
+            # Is the argument a registered command? A single dictionary probe
+            # both checks for and retrieves the command. The command's parser
+            # consumes all the remaining arguments.
+            entry = get_cmd(arg)
+            if entry is not None:
+                cmd_parser, cmd_callback = entry
                 self.cmd_name = arg
                 self.cmd_parser = cmd_parser
-                cmd_parser.parse_stream(stream)
-                cmd_callback(cmd_parser)
+                return cmd_parser, cmd_callback, i
 
             # Is the argument the automatic 'help' command?
-            elif arg == "help":
-                if stream.has_next():
-                    name = stream.next()
-                    if name in self.commands:
-                        sys.stdout.write(self.commands[name].helptext + "\n")
+            if arg == "help":
+                if i < n:
+                    name = args[i]
+                    entry = get_cmd(name)
+                    if entry is not None:
+                        sys.stdout.write(entry[0].helptext + "\n")
                         sys.exit()
                     else:
                         err("'%s' is not a recognised command" % name)
@@ -448,38 +533,27 @@ class ArgParser:
 
             # Otherwise, add the argument to our list of positional arguments.
             else:
-                self.arguments.append(arg)
-
-    # Attempt to parse the specified argument as a string, integer, or float.
-    # (Parsing as a string is a null operation.)
-    def _try_parse_arg(self, argtype, arg):
-        if argtype == "string":
-            return arg
-        elif argtype == "int":
-            try:
-                return int(arg)
-            except ValueError:
-                err("cannot parse '%s' as an integer" % arg)
-        elif argtype == "float":
-            try:
-                return float(arg)
-            except ValueError:
-                err("cannot parse '%s' as a float" % arg)
-        else:
-            raise ArgParserError("invalid option type '%s'" % argtype)
+                append_arg(arg)
+
+        return None, None, n
 
-    # Parse an option of the form --name=value or -n=value.
-    def _parse_equals_opt(self, prefix, arg):
-        name, value = arg.split("=", maxsplit=1)
+    # Parse an option of the form --name=value or -n=value. The caller supplies
+    # the index of the equals sign so the argument isn't scanned a second time.
+    # The name is interned to match the interned aliases used as keys in the
+    # options dictionary.
+    def _parse_equals_opt(self, prefix, arg, eq):
+        name = sys.intern(arg[:eq])
+        value = arg[eq + 1:]
 
         # Is the argument a registered option name?
         option = self.options.get(name)
-        if not option:
+        if option is None:
             err("%s%s is not a recognised option" % (prefix, name))
         option.found = True
+        otype = option.type
 
         # Invalid format for a boolean flag.
-        if option.type == "bool":
+        if otype == TYPE_BOOL:
             err("invalid format for boolean flag %s%s" % (prefix, name))
 
         # Make sure we have a value after the equals sign.
@@ -487,41 +561,83 @@ class ArgParser:
             err("missing argument for the %s%s option" % (prefix, name))
 
         # Try to parse the argument as a value of the appropriate type.
-        self._set_opt(name, self._try_parse_arg(option.type, value))
+        try:
+            value = option.convert(value)
+        except ValueError:
+            err("cannot parse '%s' as %s" % (value, _TYPE_NAMES[otype]))
+        option.values.append(value)
+
+    # Mark the option as found and store its value, consuming the following
+    # argument (or, for a greedy list, arguments) as required. The prefix and
+    # name are used in error messages. Returns the index of the next unconsumed
+    # argument.
+    def _consume_values(self, prefix, name, option, args, i):
+        n = len(args)
 
-    # Parse a long-form option, i.e. an option beginning with a double dash.
-    def _parse_long_opt(self, arg, stream):
+        option.found = True
+        otype = option.type
 
-        # Do we have an option of the form --name=value?
-        if "=" in arg:
-            self._parse_equals_opt("--", arg)
+        # If the option is a flag, store the boolean true.
+        if otype == TYPE_BOOL:
+            option.values.append(True)
 
-        # Is the argument a registered option name?
-        elif arg in self.options:
-            option = self.options[arg]
-            option.found = True
+        # Check for a following option value.
+        elif i < n and _is_arg(args[i]):
 
-            # If the option is a flag, store the boolean true.
-            if option.type == "bool":
-                self.set_flag(arg, True)
+            # Try to parse the argument as a value of the appropriate type.
+            try:
+                value = option.convert(args[i])
+            except ValueError:
+                err("cannot parse '%s' as %s" % (args[i], _TYPE_NAMES[otype]))
+            option.values.append(value)
+            i += 1
+
+            # If the option is a greedy list, keep trying to parse values
+            # until we hit the next option or the end of the list. The
+            # option's converter and its list's append method are bound to
+            # locals outside the loop.
+            if option.greedy:
+                convert = option.convert
+                append = option.values.append
+                try:
+                    while i < n:
+                        next_arg = args[i]
+
+                        # Stop at the next option. (This is _is_arg() inlined,
+                        # testing the first character first.)
+                        if next_arg[:1] == "-" and not (
+                                len(next_arg) == 1 or
+                                next_arg[1].isdigit()):
+                            break
+
+                        value = convert(next_arg)
+                        append(value)
+                        i += 1
+                except ValueError:
+                    err("cannot parse '%s' as %s" % (
+                        next_arg, _TYPE_NAMES[otype]))
+
+        # We're missing a required option value.
+        else:
+            err("missing argument for the %s%s option" % (prefix, name))
 
-            # Check for a following option value.
-            elif stream.has_next_value():
+        return i
 
-                # Try to parse the argument as a value of the appropriate type.
-                value = self._try_parse_arg(option.type, stream.next())
-                self._set_opt(arg, value)
+    # Parse a long-form option, i.e. an option beginning with a double dash.
+    # Returns the index of the next unconsumed argument.
+    def _parse_long_opt(self, arg, args, i):
 
-                # If the option is a greedy list, keep trying to parse values
-                # until we hit the next option or the end of the stream.
-                if option.greedy:
-                    while stream.has_next_value():
-                        value = self._try_parse_arg(option.type, stream.next())
-                        self._set_opt(arg, value)
+        # Is the argument a registered option name? Most long-form options
+        # don't use the --name=value syntax so we try the lookup first and
+        # only scan the argument for an equals sign if it fails.
+        option = self.options.get(arg)
+        if option is not None:
+            return self._consume_values("--", arg, option, args, i)
 
-            # We're missing a required option value.
-            else:
-                err("missing argument for the --%s option" % arg)
+        # Do we have an option of the form --name=value?
+        eq = arg.find("=")
+        if eq != -1:
+            self._parse_equals_opt("--", arg, eq)
 
         # Is the argument the automatic --help flag?
         elif arg == "help" and self.helptext is not None:
@@ -538,42 +654,35 @@ class ArgParser:
         else:
             err("--%s is not a recognised option" % arg)
 
+        return i
+
     # Parse a short-form option, i.e. an option beginning with a single dash.
-    def _parse_short_opt(self, arg, stream):
+    # Returns the index of the next unconsumed argument.
+    def _parse_short_opt(self, arg, args, i):
 
         # Do we have an option of the form -n=value?
-        if "=" in arg:
-            self._parse_equals_opt("-", arg)
-            return
+        eq = arg.find("=")
+        if eq != -1:
+            self._parse_equals_opt("-", arg, eq)
+            return i
 
         # We handle each character individually to support condensed options:
         #   -abc foo bar
         # is equivalent to:
         #   -a foo -b bar -c
+        # Condensed options are typically clusters of flags so we store flag
+        # values inline, saving a method call per character.
+        table = self._short_table
+        options = self.options
         for char in arg:
-            option = self.options.get(char)
-            if not option:
+            code = ord(char)
+            option = table[code] if code < 128 else options.get(char)
+            if option is None:
                 err("-%s is not a recognised option" % char)
-            option.found = True
-
-            # If the option is a flag, store the boolean true.
-            if option.type == "bool":
-                self.set_flag(char, True)
-
-            # Check for a following option value.
-            elif stream.has_next_value():
-
-                # Try to parse the argument as a value of the appropriate type.
-                value = self._try_parse_arg(option.type, stream.next())
-                self._set_opt(char, value)
-
-                # If the option is a greedy list, keep trying to parse values
-                # until we hit the next option or the end of the stream.
-                if option.greedy:
-                    while stream.has_next_value():
-                        value = self._try_parse_arg(option.type, stream.next())
-                        self._set_opt(char, value)
-
-            # We're missing a required option value.
+            if option.type == TYPE_BOOL:
+                option.found = True
+                option.values.append(True)
             else:
-                err("missing argument for the -%s option" % char)
+                i = self._consume_values("-", char, option, args, i)
+
+        return i
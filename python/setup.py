@@ -25,22 +25,40 @@ for further details.
 """
 
 import os
-import re
 import io
 
 from setuptools import setup
 
 
+# If Cython is available we compile the module to a C extension, removing the
+# interpreter overhead from the parsing loop. The pure-Python file is always
+# shipped as a fallback and the extension is optional - if it fails to build
+# (e.g. because no C compiler is available) the install still succeeds.
+# Static type declarations for the compiled module are read from clio.pxd.
+try:
+    from Cython.Build import cythonize
+    ext_modules = cythonize(['clio.py'], language_level=3)
+    for ext in ext_modules:
+        ext.optional = True
+except ImportError:
+    ext_modules = []
+
+
 filepath = os.path.join(os.path.dirname(__file__), 'clio.py')
+meta = {}
 with io.open(filepath, encoding='utf-8') as metafile:
-    regex = r'''^__([a-z]+)__ = ["'](.*)["']'''
-    meta = dict(re.findall(regex, metafile.read(), flags=re.MULTILINE))
+    for line in metafile:
+        if line.startswith('__'):
+            key, sep, value = line.partition(' = ')
+            if sep:
+                meta[key.strip('_')] = value.strip().strip('"\'')
 
 
 setup(
     name = 'libclio',
     version = meta['version'],
     py_modules = ['clio'],
+    ext_modules = ext_modules,
     author = 'Darren Mulholland',
     url = 'https://github.com/dmulholland/clio',
     license = 'Public Domain',
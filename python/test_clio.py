@@ -1,49 +1,74 @@
 # --------------------------------------------------------------------------
 # Unit tests for the clio module. Run using pytest.
+#
+# Each test builds its own parsers and module-level tables are read-only, so
+# the suite can be distributed across processes with pytest-xdist:
+#
+#   $ pytest -n auto
+#
+# The docstring below turns off pytest's assertion rewriting for this module:
+# the assertions are plain equality checks, so rewriting them only adds
+# collection cost. Without rewriting a failed assert reports no values, so
+# assertions comparing lists, tuples, or dictionaries pass the actual value
+# as the assertion message. Remove the docstring temporarily to get pytest's
+# detailed failure diffs.
 # --------------------------------------------------------------------------
 
+"""PYTEST_DONT_REWRITE"""
+
 import clio
 import pytest
+import string
+import time
 
 
 # --------------------------------------------------------------------------
-# Boolean options.
+# Single-valued options.
 # --------------------------------------------------------------------------
 
 
-def test_bool_option_empty():
-    parser = clio.ArgParser()
-    parser.add_flag("bool")
-    parser.parse([])
-    assert parser.get_flag("bool") == False
+KINDS = {
+    "flag": ("add_flag", "get_flag"),
+    "str": ("add_str", "get_str"),
+    "int": ("add_int", "get_int"),
+    "float": ("add_float", "get_float"),
+}
 
 
-def test_bool_option_missing():
-    parser = clio.ArgParser()
-    parser.add_flag("bool")
-    parser.parse(["foo", "bar"])
-    assert parser.get_flag("bool") == False
+OPTION_CASES = [
+    ("flag", "bool b", None, ("--bool",), True),
+    ("flag", "bool b", None, ("-b",), True),
+    ("str", "string s", "default", ("--string", "value"), "value"),
+    ("str", "string s", "default", ("-s", "value"), "value"),
+    ("int", "int i", 101, ("--int", "202"), 202),
+    ("int", "int i", 101, ("-i", "202"), 202),
+    ("float", "float f", 1.1, ("--float", "2.2"), 2.2),
+    ("float", "float f", 1.1, ("-f", "2.2"), 2.2),
+]
 
 
-def test_bool_option_longform():
+@pytest.mark.parametrize("kind, name, default, argv, expected", OPTION_CASES)
+def test_option(kind, name, default, argv, expected):
+    add, get = KINDS[kind]
     parser = clio.ArgParser()
-    parser.add_flag("bool")
-    parser.parse(["--bool"])
-    assert parser.get_flag("bool") == True
+    if default is None:
+        getattr(parser, add)(name)
+    else:
+        getattr(parser, add)(name, default)
+    parser.parse(argv)
+    assert getattr(parser, get)(name.split()[0]) == expected
 
 
-def test_bool_option_shortform():
-    parser = clio.ArgParser()
-    parser.add_flag("bool b")
-    parser.parse(["-b"])
-    assert parser.get_flag("bool") == True
+# --------------------------------------------------------------------------
+# Boolean options.
+# --------------------------------------------------------------------------
 
 
 def test_bool_option_dict_syntax():
     parser = clio.ArgParser()
     parser.add_flag("bool")
     parser.parse(["--bool"])
-    assert parser["bool"] == True
+    assert parser["bool"] is True
 
 
 # --------------------------------------------------------------------------
@@ -84,45 +109,31 @@ def test_bool_list_mixed():
 # --------------------------------------------------------------------------
 
 
-def test_string_option_empty():
-    parser = clio.ArgParser()
-    parser.add_str("string", "default")
-    parser.parse([])
-    assert parser.get_str("string") == "default"
-
-
-def test_string_option_missing():
+def test_string_option_dict_syntax():
     parser = clio.ArgParser()
     parser.add_str("string", "default")
-    parser.parse(["foo", "bar"])
-    assert parser.get_str("string") == "default"
+    parser.parse(["--string", "value"])
+    assert parser["string"] == "value"
 
 
-def test_string_option_longform():
+def test_string_option_equals_longform():
     parser = clio.ArgParser()
     parser.add_str("string", "default")
-    parser.parse(["--string", "value"])
-    assert parser.get_str("string") == "value"
+    parser.parse(["--string=foo=bar"])
+    assert parser.get_str("string") == "foo=bar"
 
 
-def test_string_option_shortform():
+def test_string_option_equals_shortform():
     parser = clio.ArgParser()
     parser.add_str("string s", "default")
-    parser.parse(["-s", "value"])
+    parser.parse(["-s=value"])
     assert parser.get_str("string") == "value"
 
 
-def test_string_option_dict_syntax():
-    parser = clio.ArgParser()
-    parser.add_str("string", "default")
-    parser.parse(["--string", "value"])
-    assert parser["string"] == "value"
-
-
 def test_string_option_missing_value():
     parser = clio.ArgParser()
     parser.add_str("string", "default")
-    with pytest.raises(SystemExit):
+    with pytest.raises(clio.ClioError):
         parser.parse(["--string"])
 
 
@@ -165,6 +176,16 @@ def test_string_list_mixed():
     assert parser.get_str_list("string")[1] == "baz"
 
 
+def test_string_option_value_is_last_list_value():
+    parser = clio.ArgParser()
+    parser.add_str("string", "default")
+    parser.parse(["--string", "foo"])
+    parser.get_str_list("string").append("bar")
+    assert parser.get_str("string") == "bar"
+    parser.clear_list("string")
+    assert parser.get_str("string") is None
+
+
 def test_string_greedy_list_longform():
     parser = clio.ArgParser()
     parser.add_str_list("string", True)
@@ -200,34 +221,6 @@ def test_string_greedy_list_mixed():
 # --------------------------------------------------------------------------
 
 
-def test_int_option_empty():
-    parser = clio.ArgParser()
-    parser.add_int("int", 101)
-    parser.parse([])
-    assert parser.get_int("int") == 101
-
-
-def test_int_option_missing():
-    parser = clio.ArgParser()
-    parser.add_int("int", 101)
-    parser.parse(["foo", "bar"])
-    assert parser.get_int("int") == 101
-
-
-def test_int_option_longform():
-    parser = clio.ArgParser()
-    parser.add_int("int", 101)
-    parser.parse(["--int", "202"])
-    assert parser.get_int("int") == 202
-
-
-def test_int_option_shortform():
-    parser = clio.ArgParser()
-    parser.add_int("int i", 101)
-    parser.parse(["-i", "202"])
-    assert parser.get_int("int") == 202
-
-
 def test_int_option_dict_syntax():
     parser = clio.ArgParser()
     parser.add_int("int", 101)
@@ -238,14 +231,14 @@ def test_int_option_dict_syntax():
 def test_int_option_missing_value():
     parser = clio.ArgParser()
     parser.add_int("int", 101)
-    with pytest.raises(SystemExit):
+    with pytest.raises(clio.ClioError):
         parser.parse(["--int"])
 
 
 def test_int_option_invalid_value():
     parser = clio.ArgParser()
     parser.add_int("int", 101)
-    with pytest.raises(SystemExit):
+    with pytest.raises(clio.ClioError):
         parser.parse(["--int", "foo"])
 
 
@@ -330,34 +323,6 @@ def test_int_greedy_list_mixed():
 # --------------------------------------------------------------------------
 
 
-def test_float_option_empty():
-    parser = clio.ArgParser()
-    parser.add_float("float", 1.1)
-    parser.parse([])
-    assert parser.get_float("float") == 1.1
-
-
-def test_float_option_missing():
-    parser = clio.ArgParser()
-    parser.add_float("float", 1.1)
-    parser.parse(["foo", "bar"])
-    assert parser.get_float("float") == 1.1
-
-
-def test_float_option_longform():
-    parser = clio.ArgParser()
-    parser.add_float("float", 1.1)
-    parser.parse(["--float", "2.2"])
-    assert parser.get_float("float") == 2.2
-
-
-def test_float_option_shortform():
-    parser = clio.ArgParser()
-    parser.add_float("float f", 1.1)
-    parser.parse(["-f", "2.2"])
-    assert parser.get_float("float") == 2.2
-
-
 def test_float_option_dict_syntax():
     parser = clio.ArgParser()
     parser.add_float("float", 1.1)
@@ -368,14 +333,14 @@ def test_float_option_dict_syntax():
 def test_float_option_missing_value():
     parser = clio.ArgParser()
     parser.add_float("float", 1.1)
-    with pytest.raises(SystemExit):
+    with pytest.raises(clio.ClioError):
         parser.parse(["--float"])
 
 
 def test_float_option_invalid_value():
     parser = clio.ArgParser()
     parser.add_float("float", 1.1)
-    with pytest.raises(SystemExit):
+    with pytest.raises(clio.ClioError):
         parser.parse(["--float", "foo"])
 
 
@@ -460,85 +425,110 @@ def test_float_greedy_list_mixed():
 # --------------------------------------------------------------------------
 
 
-def test_multi_options_empty():
-    parser = clio.ArgParser()
-    parser.add_flag("bool1")
-    parser.add_flag("bool2 b")
-    parser.add_str("string1", "default1")
-    parser.add_str("string2 s", "default2")
-    parser.add_int("int1", 101)
-    parser.add_int("int2 i", 202,)
-    parser.add_float("float1", 1.1)
-    parser.add_float("float2 f", 2.2)
-    parser.parse([])
-    assert parser.get_flag("bool1") == False
-    assert parser.get_flag("bool2") == False
-    assert parser.get_str("string1") == "default1"
-    assert parser.get_str("string2") == "default2"
-    assert parser.get_int("int1") == 101
-    assert parser.get_int("int2") == 202
-    assert parser.get_float("float1") == 1.1
-    assert parser.get_float("float2") == 2.2
+# Option schema for the multi-option tests: two options of each type, one
+# with and one without a single-character alias. Each entry is the option
+# kind, a key into KINDS, followed by the arguments to its add method.
+MULTI_SCHEMA = (
+    ("flag", "bool1"),
+    ("flag", "bool2 b"),
+    ("str", "string1", "default1"),
+    ("str", "string2 s", "default2"),
+    ("int", "int1", 101),
+    ("int", "int2 i", 202),
+    ("float", "float1", 1.1),
+    ("float", "float2 f", 2.2),
+)
+
+
+# Registers the options described by a schema on the parser.
+def configure(parser, schema):
+    for kind, *args in schema:
+        getattr(parser, KINDS[kind][0])(*args)
+
+
+# Returns a new parser configured with the multi-option schema.
+def make_multi_parser():
+    parser = clio.ArgParser()
+    configure(parser, MULTI_SCHEMA)
+    return parser
+
+
+MULTI_NAMES = (
+    "bool1", "bool2", "string1", "string2", "int1", "int2", "float1", "float2",
+)
+
+
+MULTI_LONGFORM_ARGV = (
+    "--bool1",
+    "--bool2",
+    "--string1", "value1",
+    "--string2", "value2",
+    "--int1", "303",
+    "--int2", "404",
+    "--float1", "3.3",
+    "--float2", "4.4",
+)
+
+
+MULTI_SHORTFORM_ARGV = (
+    "--bool1",
+    "-b",
+    "--string1", "value1",
+    "-s", "value2",
+    "--int1", "303",
+    "-i", "404",
+    "--float1", "3.3",
+    "-f", "4.4",
+)
+
+
+@pytest.mark.parametrize("argv", [(), ("foo", "bar")])
+def test_multi_options_defaults(argv):
+    parser = make_multi_parser()
+    parser.parse(argv)
+    opts = parser.get_opts(MULTI_NAMES)
+    assert opts == {
+        "bool1": False,
+        "bool2": False,
+        "string1": "default1",
+        "string2": "default2",
+        "int1": 101,
+        "int2": 202,
+        "float1": 1.1,
+        "float2": 2.2,
+    }, opts
 
 
 def test_multi_options_longform():
-    parser = clio.ArgParser()
-    parser.add_flag("bool1")
-    parser.add_flag("bool2 b")
-    parser.add_str("string1", "default1")
-    parser.add_str("string2 s", "default2")
-    parser.add_int("int1", 101)
-    parser.add_int("int2 i", 202,)
-    parser.add_float("float1", 1.1)
-    parser.add_float("float2 f", 2.2)
-    parser.parse([
-        "--bool1",
-        "--bool2",
-        "--string1", "value1",
-        "--string2", "value2",
-        "--int1", "303",
-        "--int2", "404",
-        "--float1", "3.3",
-        "--float2", "4.4",
-    ])
-    assert parser.get_flag("bool1") == True
-    assert parser.get_flag("bool2") == True
-    assert parser.get_str("string1") == "value1"
-    assert parser.get_str("string2") == "value2"
-    assert parser.get_int("int1") == 303
-    assert parser.get_int("int2") == 404
-    assert parser.get_float("float1") == 3.3
-    assert parser.get_float("float2") == 4.4
+    parser = make_multi_parser()
+    parser.parse(MULTI_LONGFORM_ARGV)
+    opts = parser.get_opts(MULTI_NAMES)
+    assert opts == {
+        "bool1": True,
+        "bool2": True,
+        "string1": "value1",
+        "string2": "value2",
+        "int1": 303,
+        "int2": 404,
+        "float1": 3.3,
+        "float2": 4.4,
+    }, opts
 
 
 def test_multi_options_shortform():
-    parser = clio.ArgParser()
-    parser.add_flag("bool1")
-    parser.add_flag("bool2 b")
-    parser.add_str("string1", "default1")
-    parser.add_str("string2 s", "default2")
-    parser.add_int("int1", 101)
-    parser.add_int("int2 i", 202,)
-    parser.add_float("float1", 1.1)
-    parser.add_float("float2 f", 2.2)
-    parser.parse([
-        "--bool1",
-        "-b",
-        "--string1", "value1",
-        "-s", "value2",
-        "--int1", "303",
-        "-i", "404",
-        "--float1", "3.3",
-        "-f", "4.4",
-    ])
-    assert parser.get_flag("bool1") == True
-    assert parser.get_flag("bool2") == True
-    assert parser.get_str("string1") == "value1"
-    assert parser.get_str("string2") == "value2"
-    assert parser.get_int("int1") == 303
-    assert parser.get_int("int2") == 404
-    assert parser.get_float("float1") == 3.3
-    assert parser.get_float("float2") == 4.4
+    parser = make_multi_parser()
+    parser.parse(MULTI_SHORTFORM_ARGV)
+    opts = parser.get_opts(MULTI_NAMES)
+    assert opts == {
+        "bool1": True,
+        "bool2": True,
+        "string1": "value1",
+        "string2": "value2",
+        "int1": 303,
+        "int2": 404,
+        "float1": 3.3,
+        "float2": 4.4,
+    }, opts
 
 
 # --------------------------------------------------------------------------
@@ -553,12 +543,70 @@ def test_condensed_options():
     parser.add_int("int i", 101)
     parser.add_float("float f", 1.1)
     parser.parse(["-bsif", "value", "202", "2.2"])
-    assert parser["bool"] == True
+    assert parser["bool"] is True
     assert parser["string"] == "value"
     assert parser["int"] == 202
     assert parser["float"] == 2.2
 
 
+def test_condensed_options_non_ascii():
+    parser = clio.ArgParser()
+    parser.add_flag("bool b")
+    parser.add_flag("eacute \u00e9")
+    parser.parse(["-b\u00e9"])
+    assert parser["bool"] is True
+    assert parser["eacute"] is True
+
+
+# --------------------------------------------------------------------------
+# Scaling.
+# --------------------------------------------------------------------------
+
+
+# Returns the best of several timings, in nanoseconds, of parsing the argument
+# list with a new parser from the factory. An initial empty parse builds the
+# parser's lookup tables outside the timed section.
+def time_parse(factory, argv, repeat=5):
+    best = None
+    for _ in range(repeat):
+        parser = factory()
+        parser.parse(())
+        start = time.perf_counter_ns()
+        parser.parse(argv)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+# Returns a new parser with a flag list for each lowercase letter. The extra
+# long-form-only flags are registered first so that a lookup which scanned the
+# options in registration order would have to pass them all.
+def make_alphabet_parser(extra=0):
+    parser = clio.ArgParser()
+    for index in range(extra):
+        parser.add_flag("flag%d" % index)
+    for char in string.ascii_lowercase:
+        parser.add_flag_list(char)
+    return parser
+
+
+def test_parse_scales_linearly():
+    cluster = string.ascii_lowercase[:16]
+    times = [
+        time_parse(make_alphabet_parser, ["-" + cluster * k])
+        for k in (256, 512, 1024)
+    ]
+    assert times[1] < 3 * times[0]
+    assert times[2] < 3 * times[1]
+
+
+def test_condensed_options_independent_of_option_count():
+    argv = ["-" + string.ascii_lowercase[:13] * 64]
+    t_small = time_parse(make_alphabet_parser, argv)
+    t_big = time_parse(lambda: make_alphabet_parser(500), argv)
+    assert t_big < 1.5 * t_small
+
+
 # --------------------------------------------------------------------------
 # Unrecognised options.
 # --------------------------------------------------------------------------
@@ -566,16 +614,23 @@ def test_condensed_options():
 
 def test_unrecognised_longform_option():
     parser = clio.ArgParser()
-    with pytest.raises(SystemExit):
+    with pytest.raises(clio.ClioError):
         parser.parse(["--foo"])
 
 
 def test_unrecognised_shortform_option():
     parser = clio.ArgParser()
-    with pytest.raises(SystemExit):
+    with pytest.raises(clio.ClioError):
         parser.parse(["-f"])
 
 
+def test_unrecognised_option_error_message():
+    parser = clio.ArgParser()
+    with pytest.raises(clio.ClioError) as excinfo:
+        parser.parse(["--foo"])
+    assert str(excinfo.value) == "Error: --foo is not a recognised option."
+
+
 # --------------------------------------------------------------------------
 # Positional arguments.
 # --------------------------------------------------------------------------
@@ -584,16 +639,29 @@ def test_unrecognised_shortform_option():
 def test_positional_args_empty():
     parser = clio.ArgParser()
     parser.parse([])
-    assert parser.has_args() == False
+    assert parser.has_args() is False
 
 
 def test_positional_args():
     parser = clio.ArgParser()
     parser.parse(["foo", "bar"])
-    assert parser.has_args() == True
-    assert parser.len_args() == 2
-    assert parser.get_arg(0) == "foo"
-    assert parser.get_arg(1) == "bar"
+    assert parser.has_args() is True
+    args = parser.get_args()
+    assert args == ["foo", "bar"], args
+
+
+def test_positional_args_from_tuple():
+    parser = clio.ArgParser()
+    parser.parse(("foo", "bar"))
+    args = parser.get_args()
+    assert args == ["foo", "bar"], args
+
+
+def test_positional_args_from_iterator():
+    parser = clio.ArgParser()
+    parser.parse(iter(["foo", "bar"]))
+    args = parser.get_args()
+    assert args == ["foo", "bar"], args
 
 
 def test_positional_args_list_syntax():
@@ -606,15 +674,38 @@ def test_positional_args_list_syntax():
 def test_positional_args_as_ints():
     parser = clio.ArgParser()
     parser.parse(["1", "11"])
-    assert parser.get_args_as_ints()[0] == 1
-    assert parser.get_args_as_ints()[1] == 11
+    ints = parser.get_args_as_ints()
+    assert ints == [1, 11], ints
 
 
 def test_positional_args_as_floats():
     parser = clio.ArgParser()
     parser.parse(["1.1", "11.1"])
-    assert parser.get_args_as_floats()[0] == 1.1
-    assert parser.get_args_as_floats()[1] == 11.1
+    floats = parser.get_args_as_floats()
+    assert floats == [1.1, 11.1], floats
+
+
+def test_positional_args_as_ints_invalid():
+    parser = clio.ArgParser()
+    parser.parse(["1", "foo"])
+    with pytest.raises(clio.ClioError):
+        parser.get_args_as_ints()
+
+
+def test_positional_args_append():
+    parser = clio.ArgParser()
+    parser.parse(["foo"])
+    parser.append_arg("bar")
+    assert parser.len_args() == 2
+    assert parser.get_arg(1) == "bar"
+
+
+def test_positional_args_from_sys_argv(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["app", "foo", "bar"])
+    parser = clio.ArgParser()
+    parser.parse()
+    args = parser.get_args()
+    assert args == ["foo", "bar"], args
 
 
 # --------------------------------------------------------------------------
@@ -633,29 +724,34 @@ def test_option_parsing_switch():
 # --------------------------------------------------------------------------
 
 
-def test_command_absent():
+# Returns a new (parser, cmd_parser) pair where the parser has a single
+# command, 'cmd', with one option of each type.
+def make_cmd_parsers():
     parser = clio.ArgParser()
     cmd_parser = parser.add_cmd("cmd", "helptext", lambda p: None)
+    cmd_parser.add_flag("bool")
+    cmd_parser.add_str("string", "default")
+    cmd_parser.add_int("int", 101)
+    cmd_parser.add_float("float", 1.1)
+    return parser, cmd_parser
+
+
+def test_command_absent():
+    parser, cmd_parser = make_cmd_parsers()
     parser.parse([])
-    assert parser.has_cmd() == False
+    assert parser.has_cmd() is False
 
 
 def test_command_present():
-    parser = clio.ArgParser()
-    cmd_parser = parser.add_cmd("cmd", "helptext", lambda p: None)
+    parser, cmd_parser = make_cmd_parsers()
     parser.parse(["cmd"])
-    assert parser.has_cmd() == True
+    assert parser.has_cmd() is True
     assert parser.get_cmd_name() == "cmd"
     assert parser.get_cmd_parser() == cmd_parser
 
 
 def test_command_with_options():
-    parser = clio.ArgParser()
-    cmd_parser = parser.add_cmd("cmd", "helptext", lambda p: None)
-    cmd_parser.add_flag("bool")
-    cmd_parser.add_str("string", "default")
-    cmd_parser.add_int("int", 101)
-    cmd_parser.add_float("float", 1.1)
+    parser, cmd_parser = make_cmd_parsers()
     parser.parse([
         "cmd",
         "foo", "bar",
@@ -663,11 +759,48 @@ def test_command_with_options():
         "--int", "202",
         "--float", "2.2",
     ])
-    assert parser.has_cmd() == True
-    assert parser.get_cmd_name() == "cmd"
+    actual = (
+        parser.has_cmd(),
+        parser.get_cmd_name(),
+        parser.get_cmd_parser() is cmd_parser,
+        cmd_parser.get_args(),
+        cmd_parser["string"],
+        cmd_parser["int"],
+        cmd_parser["float"],
+    )
+    expected = (True, "cmd", True, ["foo", "bar"], "value", 202, 2.2)
+    assert actual == expected, actual
+
+
+def test_nested_commands():
+    called = []
+    parser = clio.ArgParser()
+    cmd_parser = parser.add_cmd("cmd", "helptext",
+        lambda p: called.append("cmd"))
+    sub_parser = cmd_parser.add_cmd("sub", "helptext",
+        lambda p: called.append("sub"))
+    sub_parser.add_flag("bool")
+    parser.parse(["cmd", "foo", "sub", "bar", "--bool"])
     assert parser.get_cmd_parser() == cmd_parser
-    assert cmd_parser.has_args() == True
-    assert cmd_parser.len_args() == 2
-    assert cmd_parser["string"] == "value"
-    assert cmd_parser["int"] == 202
-    assert cmd_parser["float"] == 2.2
+    assert cmd_parser.get_cmd_parser() == sub_parser
+    cmd_args = cmd_parser.get_args()
+    assert cmd_args == ["foo"], cmd_args
+    sub_args = sub_parser.get_args()
+    assert sub_args == ["bar"], sub_args
+    assert sub_parser["bool"] is True
+    assert called == ["sub", "cmd"], called
+
+
+# --------------------------------------------------------------------------
+# Debug output.
+# --------------------------------------------------------------------------
+
+
+def test_str_lists_each_option_once():
+    parser = clio.ArgParser()
+    parser.add_flag("bool b")
+    parser.add_str("string s", "default")
+    output = str(parser)
+    assert output.count("bool b: [False]") == 1
+    assert output.count("string s: ['default']") == 1
+